@@ -2,17 +2,21 @@
 JWT authentication utilities.
 """
 
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.database import get_db
 from app.models import User
 
+logger = logging.getLogger(__name__)
+
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
@@ -33,7 +37,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # Verify using bcrypt directly
         return bcrypt.checkpw(password_bytes, hashed_password.encode('utf-8'))
     except Exception as e:
-        print(f"Password verification error: {e}")
+        logger.warning("Password verification error: %s", e)
         return False
 
 
@@ -71,7 +75,7 @@ def decode_token(token: str) -> Optional[dict]:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get the current authenticated user from JWT token."""
     credentials_exception = HTTPException(
@@ -90,7 +94,8 @@ async def get_current_user(
     if email is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
     
@@ -99,7 +104,7 @@ async def get_current_user(
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """Get the current user if authenticated, otherwise return None."""
     if credentials is None:
@@ -2,25 +2,51 @@
 Database connection and session management.
 """
 
+import logging
+from typing import Tuple
+from uuid import uuid4
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+def _pool_kwargs() -> dict:
+    """
+    Build connection pool arguments for the async engine from settings.
+    Defaults to a bounded queue pool (QueuePool / AsyncAdaptedQueuePool) so requests
+    reuse established TLS connections; set DB_POOL_CLASS=null to open a fresh
+    connection per checkout instead.
+    """
+    if settings.DB_POOL_CLASS.lower() == "null":
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Recycle before Supabase/pgbouncer drops idle connections
+    }
+
+
 # Create database engine
-# Use NullPool for Supabase to avoid connection pool issues
+# DATABASE_URL should point at Supabase's pgbouncer port (6543) rather than 5432
+# Sync engine: only scripts and create_all use it, so it holds no idle connections
+# and DB_POOL_SIZE / DB_MAX_OVERFLOW budget the async engine alone
 try:
     engine = create_engine(
         settings.DATABASE_URL,
         pool_pre_ping=True,  # Verify connections before using
-        poolclass=NullPool,  # Disable connection pooling for Supabase
         connect_args={
             "sslmode": "require"  # Supabase requires SSL
-        }
+        },
+        poolclass=NullPool
     )
 except Exception as e:
-    print(f"⚠ Database engine creation error: {e}")
+    logger.warning("Database engine creation error: %s", e)
     # Fallback without SSL (for local development)
     engine = create_engine(
         settings.DATABASE_URL,
@@ -31,18 +57,68 @@ except Exception as e:
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# libpq (psycopg2) query parameters that asyncpg.connect() rejects
+_LIBPQ_ONLY_PARAMS = ("sslmode", "sslrootcert", "sslcert", "sslkey", "connect_timeout", "options")
+
+
+def _async_database_url(url: str) -> Tuple[URL, str]:
+    """
+    Rewrite a sync PostgreSQL URL to use the asyncpg driver.
+    libpq-only query parameters are removed; sslmode (default "require") is
+    returned separately, to be passed as asyncpg's ssl argument.
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            url = "postgresql+asyncpg://" + url[len(prefix):]
+            break
+    parsed = make_url(url)
+    ssl = parsed.query.get("sslmode", "require")
+    return parsed.difference_update_query(_LIBPQ_ONLY_PARAMS), ssl
+
+
+# pgbouncer transaction mode hands each transaction a different server connection,
+# so neither asyncpg nor SQLAlchemy may cache prepared statements, and statement
+# names must be unique rather than sequential per client connection
+_PGBOUNCER_CONNECT_ARGS = {
+    "statement_cache_size": 0,  # asyncpg's own cache
+    "prepared_statement_cache_size": 0,  # SQLAlchemy asyncpg dialect's cache
+    "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+}
+
+# Async engine used by request handlers so DB I/O doesn't block the event loop
+try:
+    _async_url, _async_ssl = _async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(
+        _async_url,
+        pool_pre_ping=True,
+        connect_args={
+            "ssl": _async_ssl,  # Supabase requires SSL
+            **_PGBOUNCER_CONNECT_ARGS
+        },
+        **_pool_kwargs()
+    )
+except Exception as e:
+    logger.warning("Async database engine creation error: %s", e)
+    # Fallback without SSL (for local development)
+    async_engine = create_async_engine(
+        _async_database_url(settings.DATABASE_URL)[0],
+        pool_pre_ping=True,
+        connect_args=_PGBOUNCER_CONNECT_ARGS,
+        **_pool_kwargs()
+    )
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
-    Dependency function to get database session.
+    Dependency function to get an async database session.
     Yields a database session and closes it after use.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
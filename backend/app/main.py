@@ -2,48 +2,71 @@
 FastAPI application entry point.
 """
 
+import logging
+import re
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.exc import OperationalError
 
 from app.config import settings
 from app.routers import auth, queries, health
 from app.database import engine, Base
+from app.services.quran_service import quran_service
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    description="Quran-centric, citation-locked Question Answering system"
+    description="Quran-centric, citation-locked Question Answering system",
+    default_response_class=ORJSONResponse
 )
 
 # Startup event for DB
 @app.on_event("startup")
 def on_startup():
+    # Tables are created only when AUTO_CREATE_TABLES is set (first deploy / local dev)
+    if not settings.AUTO_CREATE_TABLES:
+        return
     try:
         Base.metadata.create_all(bind=engine)
-        print("✅ Database connected and tables created")
+        logger.info("Database connected and tables created")
     except OperationalError as e:
-        print(f"⚠️ Database connection error: {e}")
-        print("⚠️ Database not available. Some features may not work.")
-    except Exception as e:
-        print(f"⚠️ Database setup error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.warning("Database connection error: %s", e)
+        logger.warning("Database not available. Some features may not work.")
+    except Exception:
+        logger.exception("Database setup error")
+
+# Startup event for the retrieval model/index (first run also exports the ONNX encoder)
+@app.on_event("startup")
+async def on_startup_warm_up():
+    if settings.PRELOAD_RETRIEVAL:
+        quran_service.start_warm_up()
+
+# Shutdown event for shared HTTP connections
+@app.on_event("shutdown")
+async def on_shutdown():
+    await quran_service.aclose()
 
 # Configure CORS - MUST be added before routers
 # Get origins from settings (parsed from CORS_ORIGINS env variable)
 cors_origins = settings.cors_origins_list
 
-print(f"🔧 CORS Origins: {cors_origins}")
+logger.info("CORS Origins: %s", cors_origins)
 
 # Vercel preview URLs pattern (matches *.vercel.app and *-*.vercel.app)
-vercel_pattern = r"https://.*\.vercel\.app"
+vercel_pattern = r"https://[\w-]+\.vercel\.app"
+
+# Single alternation of the explicit origins plus Vercel previews; CORSMiddleware
+# compiles it once and validates each Origin with one regex match
+cors_origin_regex = "^(?:" + "|".join(re.escape(origin) for origin in cors_origins) + "|" + vercel_pattern + ")$"
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=cors_origins,  # Explicit list of allowed origins (production-safe)
-    allow_origin_regex=vercel_pattern,  # Allow all Vercel preview deployments
+    allow_origin_regex=cors_origin_regex,  # Explicit origins + all Vercel preview deployments
     allow_credentials=True,  # Required for cookies/auth headers
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],  # Includes OPTIONS for preflight
     allow_headers=["Content-Type", "Authorization", "Accept"],  # Explicit headers (production-safe)
@@ -2,7 +2,7 @@
 SQLAlchemy database models.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -29,12 +29,18 @@ class QueryHistory(Base):
     __tablename__ = "query_history"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # Nullable for anonymous queries
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Nullable for anonymous queries (indexed below)
     query = Column(Text, nullable=False)
     answer = Column(Text, nullable=False)
     citations = Column(Text, nullable=True)  # JSON string of citations
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Serves /history (filter by user, newest first) straight from the index;
+    # also covers plain user_id lookups, so no separate user_id index is needed
+    __table_args__ = (
+        Index("ix_query_history_user_created", user_id, created_at.desc()),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="query_history")
 
@@ -2,8 +2,10 @@
 Authentication endpoints.
 """
 
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token
@@ -11,15 +13,18 @@ from app.auth import get_password_hash, verify_password, create_access_token, ge
 from datetime import timedelta
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        result = await db.execute(select(User).where(User.email == user_data.email))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,17 +39,15 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return new_user
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ Registration error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        await db.rollback()
+        logger.exception("Registration error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
@@ -52,10 +55,11 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserCreate, db: Session = Depends(get_db)):
+async def login(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Login and get access token."""
     # Find user
-    user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -2,24 +2,49 @@
 Query endpoints for Quran Q&A.
 """
 
-import json
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
+import logging
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from app.database import get_db, AsyncSessionLocal
 from app.models import User, QueryHistory
 from app.schemas import QueryRequest, QueryResponse, QueryHistoryResponse, VerseCitation
 from app.auth import get_current_user_optional
 from app.services.quran_service import quran_service
 from app.services.cache_service import cache_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
+async def _persist_history(user_id: int, query: str, answer: str, citations_json: str):
+    """
+    Save a query to history after the response has been sent.
+    Opens its own session - the request-scoped session is closed by then.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            db.add(QueryHistory(
+                user_id=user_id,
+                query=query,
+                answer=answer,
+                citations=citations_json
+            ))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error("Query history save error: %s", e)
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query_quran(
     query_request: QueryRequest,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
@@ -27,7 +52,7 @@ async def query_quran(
     Public endpoint - works with or without authentication.
     """
     # Check cache first
-    cached_result = cache_service.get(
+    cached_result = await cache_service.get(
         query_request.query,
         query_request.k,
         query_request.score_threshold,
@@ -35,47 +60,45 @@ async def query_quran(
     )
     
     if cached_result:
-        # Convert cached result to response format
-        citations = [VerseCitation(**c) for c in cached_result.get("citations", [])]
-        return QueryResponse(
-            query=cached_result["query"],
-            answer=cached_result["answer"],
-            citations=citations,
-            has_answer=cached_result["has_answer"],
-            processing_time=cached_result.get("processing_time")
-        )
+        # Returned as-is: response_model validates and filters it exactly once
+        return cached_result
     
     # Process query
     try:
-        result = quran_service.answer_query(
+        result = await quran_service.answer_query(
             query=query_request.query,
             k=query_request.k,
             score_threshold=query_request.score_threshold,
             window=query_request.window
         )
         
-        # Cache the result
-        cache_service.set(
-            query_request.query,
-            query_request.k,
-            query_request.score_threshold,
-            query_request.window,
-            result
-        )
+        # Failed explanations are returned but neither cached nor saved to history
+        failed = quran_service.is_error_answer(result["answer"])
+        
+        # Cache the result (after the response is sent)
+        if not failed:
+            background_tasks.add_task(
+                cache_service.set,
+                query_request.query,
+                query_request.k,
+                query_request.score_threshold,
+                query_request.window,
+                result
+            )
         
-        # Convert citations to schema format
+        # Convert citations to schema format (response only)
         citations = [VerseCitation(**c) for c in result.get("citations", [])]
         
-        # Save to query history if user is authenticated
-        if current_user:
-            query_history = QueryHistory(
-                user_id=current_user.id,
-                query=query_request.query,
-                answer=result["answer"],
-                citations=json.dumps([c.dict() for c in citations], default=str)
+        # Save to query history if user is authenticated (after the response is sent)
+        if current_user and not failed:
+            background_tasks.add_task(
+                _persist_history,
+                current_user.id,
+                query_request.query,
+                result["answer"],
+                # Service already returns plain dicts - store them without a pydantic round-trip
+                orjson.dumps(result.get("citations", [])).decode()
             )
-            db.add(query_history)
-            db.commit()
         
         return QueryResponse(
             query=result["query"],
@@ -92,15 +115,101 @@ async def query_quran(
         )
 
 
-@router.get("/history", response_model=List[QueryHistoryResponse])
+def _sse(event: Dict[str, Any]) -> str:
+    """Format an event as a Server-Sent Events frame."""
+    return f"data: {orjson.dumps(event).decode()}\n\n"
+
+
+async def _store_streamed_result(query_request: QueryRequest, user_id: Optional[int], completed: Dict[str, Any]):
+    """Cache (and save to history) a streamed answer once the stream has finished."""
+    if not completed:
+        return
+    await cache_service.set(
+        query_request.query,
+        query_request.k,
+        query_request.score_threshold,
+        query_request.window,
+        completed
+    )
+    if user_id is not None:
+        await _persist_history(
+            user_id,
+            query_request.query,
+            completed["answer"],
+            orjson.dumps(completed["citations"]).decode()
+        )
+
+
+@router.post("/query/stream")
+async def query_quran_stream(
+    query_request: QueryRequest,
+    background_tasks: BackgroundTasks,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """
+    Query the Quran using RAG pipeline, streaming the answer as Server-Sent Events.
+    Emits a citations event, then answer tokens, then a final "done" event
+    (or an "error" event, in which case nothing is cached or saved).
+    Public endpoint - works with or without authentication.
+    """
+    cached_result = await cache_service.get(
+        query_request.query,
+        query_request.k,
+        query_request.score_threshold,
+        query_request.window
+    )
+    
+    if cached_result:
+        def cached_stream() -> Iterator[str]:
+            yield _sse({"citations": cached_result.get("citations", []), "has_answer": cached_result["has_answer"]})
+            yield _sse({"token": cached_result["answer"]})
+            yield _sse({"done": True, "processing_time": cached_result.get("processing_time")})
+        
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+    
+    # Filled in by the generator when the stream completes; read by the background task
+    completed: Dict[str, Any] = {}
+    
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event in quran_service.stream_query(
+                query=query_request.query,
+                k=query_request.k,
+                score_threshold=query_request.score_threshold,
+                window=query_request.window
+            ):
+                if "result" in event:
+                    completed.update(event["result"])
+                    event = {"done": True, "processing_time": completed["processing_time"]}
+                yield _sse(event)
+        except Exception as e:
+            logger.error("Streaming query error: %s", e)
+            yield _sse({"error": f"Error processing query: {str(e)}"})
+    
+    # Runs after the last frame is sent
+    background_tasks.add_task(
+        _store_streamed_result,
+        query_request,
+        current_user.id if current_user else None,
+        completed
+    )
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# exclude_unset: expanded_citations is only set with ?expand=true, so default responses
+# keep their original shape; null columns read from the row (e.g. citations) still appear
+@router.get("/history", response_model=List[QueryHistoryResponse], response_model_exclude_unset=True)
 async def get_query_history(
     skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    expand: bool = False,
+    db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Get query history for the authenticated user.
+    With expand=true, citations are also returned parsed (expanded_citations).
     Requires authentication.
     """
     if not current_user:
@@ -109,14 +218,37 @@ async def get_query_history(
             detail="Authentication required"
         )
     
-    history = db.query(QueryHistory)\
-        .filter(QueryHistory.user_id == current_user.id)\
-        .order_by(QueryHistory.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    result = await db.execute(
+        select(QueryHistory)
+        # Only the columns QueryHistoryResponse serializes
+        .options(load_only(
+            QueryHistory.id,
+            QueryHistory.query,
+            QueryHistory.answer,
+            QueryHistory.citations,
+            QueryHistory.created_at
+        ))
+        .where(QueryHistory.user_id == current_user.id)
+        .order_by(QueryHistory.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    
+    history = result.scalars().all()
+    if not expand:
+        return history
     
-    return history
+    return [
+        QueryHistoryResponse(
+            id=row.id,
+            query=row.query,
+            answer=row.answer,
+            citations=row.citations,
+            expanded_citations=orjson.loads(row.citations) if row.citations else [],
+            created_at=row.created_at
+        )
+        for row in history
+    ]
 
 
 
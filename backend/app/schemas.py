@@ -76,6 +76,7 @@ class QueryHistoryResponse(BaseModel):
     query: str
     answer: str
     citations: Optional[str] = None
+    expanded_citations: Optional[List[VerseCitation]] = None  # Parsed citations (?expand=true)
     created_at: datetime
     
     class Config:
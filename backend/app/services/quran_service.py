@@ -3,63 +3,130 @@ Service layer for Quran RAG operations.
 Wraps the existing QuranRetrieval and QuranLLMExplainer classes.
 """
 
+import asyncio
+import logging
 import sys
 import os
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Optional, Tuple
 import time
 
 # Add parent directory to path to import existing modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 
-from quran_retrieval2 import QuranRetrieval
-from llm_explainer import QuranLLMExplainer
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# FAISS / sentence-transformers / OpenAI are imported on first use, not at app startup
+if TYPE_CHECKING:
+    from quran_retrieval2 import QuranRetrieval
+    from llm_explainer import QuranLLMExplainer
+
 
 class QuranService:
     """Service for handling Quran queries using RAG pipeline."""
     
     def __init__(self):
         """Initialize the service with lazy loading."""
-        self._retrieval: Optional[QuranRetrieval] = None
-        self._explainer: Optional[QuranLLMExplainer] = None
+        self._retrieval: Optional["QuranRetrieval"] = None
+        self._explainer: Optional["QuranLLMExplainer"] = None
+        # Guard lazy init so concurrent first requests don't load FAISS twice
+        # (separate locks: the explainer is built on the event loop, retrieval in a worker thread)
+        self._retrieval_lock = threading.Lock()
+        self._explainer_lock = threading.Lock()
+        # Bounded in-process LRU of (stored_at, result) keyed on the query parameters;
+        # entries expire after CACHE_TTL, like the Redis cache
+        self._answer_cache: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._warm_up_task: Optional[asyncio.Future] = None
     
     @property
-    def retrieval(self) -> QuranRetrieval:
+    def retrieval(self) -> "QuranRetrieval":
         """Lazy load retrieval system."""
         if self._retrieval is None:
-            # Use absolute paths - check project root first
-            base_path = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            # If files not in project root, try current directory
-            json_path = os.path.join(base_path, settings.QURAN_JSON_PATH)
-            index_path = os.path.join(base_path, settings.FAISS_INDEX_PATH)
-            metadata_path = os.path.join(base_path, settings.QURAN_METADATA_PATH)
-            
-            # Fallback to current directory if not found
-            if not os.path.exists(json_path):
-                json_path = settings.QURAN_JSON_PATH
-            if not os.path.exists(index_path):
-                index_path = settings.FAISS_INDEX_PATH
-            if not os.path.exists(metadata_path):
-                metadata_path = settings.QURAN_METADATA_PATH
-            
-            self._retrieval = QuranRetrieval(
-                json_path=json_path,
-                index_path=index_path,
-                metadata_path=metadata_path
-            )
+            with self._retrieval_lock:
+                if self._retrieval is None:
+                    from quran_retrieval2 import QuranRetrieval
+                    
+                    # Use absolute paths - check project root first
+                    base_path = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+                    # If files not in project root, try current directory
+                    json_path = os.path.join(base_path, settings.QURAN_JSON_PATH)
+                    index_path = os.path.join(base_path, settings.FAISS_INDEX_PATH)
+                    metadata_path = os.path.join(base_path, settings.QURAN_METADATA_PATH)
+                    
+                    # Fallback to current directory if not found
+                    if not os.path.exists(json_path):
+                        json_path = settings.QURAN_JSON_PATH
+                    if not os.path.exists(index_path):
+                        index_path = settings.FAISS_INDEX_PATH
+                    if not os.path.exists(metadata_path):
+                        metadata_path = settings.QURAN_METADATA_PATH
+                    
+                    # preload: model (ONNX export/quantization on first run), index and
+                    # metadata all load here, not inside the first search
+                    self._retrieval = QuranRetrieval(
+                        json_path=json_path,
+                        index_path=index_path,
+                        metadata_path=metadata_path,
+                        preload=True
+                    )
         return self._retrieval
     
     @property
-    def explainer(self) -> QuranLLMExplainer:
+    def explainer(self) -> "QuranLLMExplainer":
         """Lazy load LLM explainer."""
         if self._explainer is None:
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OPENAI_API_KEY not configured")
-            self._explainer = QuranLLMExplainer(api_key=settings.OPENAI_API_KEY)
+            with self._explainer_lock:
+                if self._explainer is None:
+                    from llm_explainer import QuranLLMExplainer
+                    
+                    if not settings.OPENAI_API_KEY:
+                        raise ValueError("OPENAI_API_KEY not configured")
+                    self._explainer = QuranLLMExplainer(api_key=settings.OPENAI_API_KEY)
         return self._explainer
     
-    def answer_query(
+    def start_warm_up(self) -> None:
+        """Load the retrieval system in a worker thread, off the request path (call on startup)."""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.ensure_future(asyncio.to_thread(self._warm_up))
+    
+    def _warm_up(self) -> None:
+        """Load retrieval now; errors are logged and retried lazily by the first query."""
+        try:
+            self.retrieval
+            logger.info("Quran retrieval loaded")
+        except Exception as e:
+            logger.warning("Quran retrieval warm-up failed: %s", e)
+    
+    async def aclose(self) -> None:
+        """Release the shared OpenAI HTTP client if the explainer was loaded."""
+        if self._explainer is not None:
+            from llm_explainer import close_http_client
+            
+            await close_http_client()
+    
+    def is_error_answer(self, answer: str) -> bool:
+        """Whether an answer is the explainer's fallback for a failed upstream call."""
+        return self._explainer is not None and self._explainer.is_error_answer(answer)
+    
+    def _retrieve(
+        self,
+        query: str,
+        k: int,
+        score_threshold: Optional[float],
+        window: int
+    ) -> Dict[str, Any]:
+        """Get the citation bundle (blocking: index load, embedding, FAISS search)."""
+        return self.retrieval.retrieve_citation_bundle(
+            query=query,
+            k=k,
+            score_threshold=score_threshold,
+            window=window
+        )
+    
+    async def answer_query(
         self,
         query: str,
         k: int = 5,
@@ -68,22 +135,47 @@ class QuranService:
     ) -> Dict[str, Any]:
         """
         Answer a query using the RAG pipeline.
+        Repeated identical queries are served from an in-process LRU cache
+        (failed explanations are not cached; entries expire after CACHE_TTL).
         
         Returns:
             Dictionary with answer, citations, and metadata
         """
         start_time = time.time()
+        key = (query, k, score_threshold, window)
+        cached = self._answer_cache.get(key)
+        if cached is not None:
+            stored_at, result = cached
+            if time.monotonic() - stored_at < settings.CACHE_TTL:
+                self._answer_cache.move_to_end(key)
+                # Report this request's own (lookup) time, not the original run's
+                return {**result, "processing_time": time.time() - start_time}
+            del self._answer_cache[key]
         
-        # Get citation bundle
-        citation_bundle = self.retrieval.retrieve_citation_bundle(
-            query=query,
-            k=k,
-            score_threshold=score_threshold,
-            window=window
-        )
+        result = await self._answer_query(query, k, score_threshold, window)
+        
+        # Don't pin transient upstream failures in the cache
+        if not self.is_error_answer(result["answer"]):
+            self._answer_cache[key] = (time.monotonic(), result)
+            if len(self._answer_cache) > settings.QUERY_CACHE_SIZE:
+                self._answer_cache.popitem(last=False)
+        return dict(result)
+    
+    async def _answer_query(
+        self,
+        query: str,
+        k: int,
+        score_threshold: Optional[float],
+        window: int
+    ) -> Dict[str, Any]:
+        """Run retrieval and explanation for a query (uncached)."""
+        start_time = time.time()
+        
+        # Get citation bundle (in a worker thread so the event loop stays free)
+        citation_bundle = await asyncio.to_thread(self._retrieve, query, k, score_threshold, window)
         
         # Generate explanation
-        answer = self.explainer.explain(citation_bundle)
+        answer = await self.explainer.explain(citation_bundle)
         
         processing_time = time.time() - start_time
         
@@ -94,6 +186,49 @@ class QuranService:
             "has_answer": citation_bundle.get("has_answer", False),
             "processing_time": processing_time
         }
+    
+    async def stream_query(
+        self,
+        query: str,
+        k: int = 5,
+        score_threshold: Optional[float] = None,
+        window: int = 1
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer a query using the RAG pipeline, streaming the explanation.
+        
+        Yields:
+            A citations event, then one event per answer token, then a final
+            event whose "result" has the same shape as answer_query()'s return.
+            If the explanation fails midway, an "error" event ends the stream instead.
+        """
+        start_time = time.time()
+        
+        citation_bundle = await asyncio.to_thread(self._retrieve, query, k, score_threshold, window)
+        citations = citation_bundle.get("results", [])
+        has_answer = citation_bundle.get("has_answer", False)
+        yield {"citations": citations, "has_answer": has_answer}
+        
+        tokens = []
+        try:
+            async for token in self.explainer.explain_stream(citation_bundle):
+                tokens.append(token)
+                yield {"token": token}
+        except Exception as e:
+            # No final "result" event: a partial answer must not be cached or saved
+            yield {"error": self.explainer.error_answer(e)}
+            return
+        
+        yield {
+            "done": True,
+            "result": {
+                "query": query,
+                "answer": "".join(tokens).strip(),
+                "citations": citations,
+                "has_answer": has_answer,
+                "processing_time": time.time() - start_time
+            }
+        }
 
 
 # Global service instance (singleton pattern)
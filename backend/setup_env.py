@@ -41,6 +41,9 @@ API_V1_PREFIX=/api/v1
 # Note: @ in password is URL-encoded as %40
 DATABASE_URL={database_url}
 
+# Create tables on startup (first deploy / local development)
+AUTO_CREATE_TABLES=true
+
 # Redis (optional - leave empty if not using)
 REDIS_URL=
 
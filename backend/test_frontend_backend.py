@@ -3,20 +3,21 @@ Test script to verify frontend-backend connection.
 Run this after starting the backend server.
 """
 
-import requests
-import json
+import asyncio
+import httpx
 
 BACKEND_URL = "http://localhost:8000"
 FRONTEND_URL = "http://localhost:3000"
 
-def test_backend_health():
+
+async def test_backend_health(client: httpx.AsyncClient):
     """Test if backend is running."""
     print("=" * 60)
     print("Testing Backend Connection")
     print("=" * 60)
     
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=5)
+        response = await client.get("/health", timeout=5)
         if response.status_code == 200:
             print(f"✓ Backend is running at {BACKEND_URL}")
             print(f"  Response: {response.json()}")
@@ -24,7 +25,7 @@ def test_backend_health():
         else:
             print(f"✗ Backend returned status {response.status_code}")
             return False
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print(f"✗ Cannot connect to backend at {BACKEND_URL}")
         print("  Make sure backend is running: python run.py")
         return False
@@ -33,82 +34,105 @@ def test_backend_health():
         return False
 
 
-def test_api_endpoints():
+async def test_api_endpoints(client: httpx.AsyncClient):
     """Test key API endpoints."""
+    # Fire all probes concurrently; wall time is the slowest call, not the sum
+    root, register, query = await asyncio.gather(
+        client.get("/", timeout=5),
+        client.post(
+            "/api/v1/auth/register",
+            json={"email": "test@example.com", "password": "testpass123"},
+            timeout=5
+        ),
+        client.post(
+            "/api/v1/queries/query",
+            json={"query": "What does the Quran say about fasting?", "k": 3},
+            timeout=30
+        ),
+        return_exceptions=True
+    )
+    
     print("\n" + "=" * 60)
     print("Testing API Endpoints")
     print("=" * 60)
     
     # Test root
-    try:
-        response = requests.get(f"{BACKEND_URL}/", timeout=5)
-        print(f"✓ GET / - Status: {response.status_code}")
-    except Exception as e:
-        print(f"✗ GET / - Error: {e}")
+    if isinstance(root, Exception):
+        print(f"✗ GET / - Error: {root}")
+    else:
+        print(f"✓ GET / - Status: {root.status_code}")
     
     # Test register endpoint
-    try:
-        response = requests.post(
-            f"{BACKEND_URL}/api/v1/auth/register",
-            json={"email": "test@example.com", "password": "testpass123"},
-            timeout=5
-        )
-        status = "Created" if response.status_code == 201 else "Exists/Error"
-        print(f"✓ POST /api/v1/auth/register - Status: {response.status_code} ({status})")
-    except Exception as e:
-        print(f"✗ POST /api/v1/auth/register - Error: {e}")
+    if isinstance(register, Exception):
+        print(f"✗ POST /api/v1/auth/register - Error: {register}")
+    else:
+        status = "Created" if register.status_code == 201 else "Exists/Error"
+        print(f"✓ POST /api/v1/auth/register - Status: {register.status_code} ({status})")
     
     # Test query endpoint
-    try:
-        response = requests.post(
-            f"{BACKEND_URL}/api/v1/queries/query",
-            json={"query": "What does the Quran say about fasting?", "k": 3},
-            timeout=30
-        )
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✓ POST /api/v1/queries/query - Status: 200")
-            print(f"  Answer: {data.get('answer', '')[:100]}...")
-            print(f"  Citations: {len(data.get('citations', []))} verses")
-        else:
-            print(f"⚠ POST /api/v1/queries/query - Status: {response.status_code}")
-            print(f"  Response: {response.text[:200]}")
-    except requests.exceptions.Timeout:
+    if isinstance(query, httpx.TimeoutException):
         print("⚠ POST /api/v1/queries/query - Timeout (this is normal for first query)")
-    except Exception as e:
-        print(f"✗ POST /api/v1/queries/query - Error: {e}")
+    elif isinstance(query, Exception):
+        print(f"✗ POST /api/v1/queries/query - Error: {query}")
+    elif query.status_code == 200:
+        data = query.json()
+        print(f"✓ POST /api/v1/queries/query - Status: 200")
+        print(f"  Answer: {data.get('answer', '')[:100]}...")
+        print(f"  Citations: {len(data.get('citations', []))} verses")
+    else:
+        print(f"⚠ POST /api/v1/queries/query - Status: {query.status_code}")
+        print(f"  Response: {query.text[:200]}")
 
 
-def test_cors():
+async def test_cors(client: httpx.AsyncClient):
     """Test CORS configuration."""
-    print("\n" + "=" * 60)
-    print("Testing CORS Configuration")
-    print("=" * 60)
-    
     try:
         headers = {
             "Origin": FRONTEND_URL,
             "Access-Control-Request-Method": "POST"
         }
-        response = requests.options(
-            f"{BACKEND_URL}/api/v1/queries/query",
+        response = await client.options(
+            "/api/v1/queries/query",
             headers=headers,
             timeout=5
         )
+    except Exception as e:
+        response = e
+    
+    print("\n" + "=" * 60)
+    print("Testing CORS Configuration")
+    print("=" * 60)
+    
+    if isinstance(response, Exception):
+        print(f"✗ CORS test error: {response}")
+        return
+    
+    cors_headers = {
+        k: v for k, v in response.headers.items()
+        if k.lower().startswith("access-control")
+    }
+    
+    if cors_headers:
+        print("✓ CORS headers present:")
+        for k, v in cors_headers.items():
+            print(f"  {k}: {v}")
+    else:
+        print("⚠ No CORS headers found")
+
+
+async def run_checks():
+    """Run all checks over one shared (keep-alive) client."""
+    async with httpx.AsyncClient(base_url=BACKEND_URL) as client:
+        backend_ok = await test_backend_health(client)
         
-        cors_headers = {
-            k: v for k, v in response.headers.items()
-            if k.lower().startswith("access-control")
-        }
+        if backend_ok:
+            # Output is printed per test once its probes complete
+            await asyncio.gather(
+                test_api_endpoints(client),
+                test_cors(client)
+            )
         
-        if cors_headers:
-            print("✓ CORS headers present:")
-            for k, v in cors_headers.items():
-                print(f"  {k}: {v}")
-        else:
-            print("⚠ No CORS headers found")
-    except Exception as e:
-        print(f"✗ CORS test error: {e}")
+        return backend_ok
 
 
 def main():
@@ -117,12 +141,9 @@ def main():
     print("FRONTEND-BACKEND CONNECTION TEST")
     print("=" * 60)
     
-    backend_ok = test_backend_health()
+    backend_ok = asyncio.run(run_checks())
     
     if backend_ok:
-        test_api_endpoints()
-        test_cors()
-        
         print("\n" + "=" * 60)
         print("SUMMARY")
         print("=" * 60)
@@ -139,6 +160,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-
-
@@ -5,11 +5,53 @@ Provides a strict, citation-locked explanation system using OpenAI's chatgpt-4o-
 Only uses verses from the citation JSON - no external knowledge or hallucination.
 """
 
-import json
-from typing import Optional
-from openai import OpenAI
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+import httpx
+import orjson
+from openai import AsyncOpenAI
 from quran_retrieval2 import QuranRetrieval
 
+# Caps concurrent upstream OpenAI calls across all explainer instances
+_UPSTREAM_SEMAPHORE = asyncio.Semaphore(int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")))
+
+# Queue marker: the upstream stream has ended (normally or with an error)
+_STREAM_END = object()
+
+# One HTTP/2 keep-alive connection pool shared by all explainers, so DNS/TLS setup
+# is paid once per process rather than per client / per request.
+# Created on first use and reset on close, so a new app lifecycle gets a fresh one
+_SHARED_HTTPX: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it if needed (or after a close)."""
+    global _SHARED_HTTPX
+    if _SHARED_HTTPX is None or _SHARED_HTTPX.is_closed:
+        _SHARED_HTTPX = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=30.0
+        )
+    return _SHARED_HTTPX
+
+
+def _dumps(obj) -> str:
+    """Compact UTF-8 JSON (orjson); the module's only serialization path."""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on application shutdown)."""
+    global _SHARED_HTTPX
+    client, _SHARED_HTTPX = _SHARED_HTTPX, None
+    if client is not None:
+        await client.aclose()
+
 
 class QuranLLMExplainer:
     """
@@ -53,6 +95,9 @@ explicitly contains verses addressing those concepts.
 
 Failure to follow these rules is an error."""
 
+    # Stable prefix-cache key for OpenAI prompt caching; any prompt edit changes it
+    PROMPT_CACHE_KEY = f"quran_explainer_{hashlib.md5(SYSTEM_PROMPT.encode()).hexdigest()[:8]}"
+
     def __init__(
         self,
         api_key: str,
@@ -69,12 +114,92 @@ Failure to follow these rules is an error."""
             temperature: Sampling temperature (0.0 for deterministic)
             max_tokens: Maximum tokens in response
         """
-        self.client = OpenAI(api_key=api_key)
+        # The OpenAI client is created on first use (see the client property)
+        self._api_key = api_key
+        self._client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        # Built once: the system message is identical for every request
+        self._system_msg = {"role": "system", "content": self.SYSTEM_PROMPT}
+        self._prompt_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._prompt_cache_lock = threading.Lock()
+        # Single-flight: identical bundles explained concurrently share one API call
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """OpenAI client, created on first request."""
+        http_client = _get_http_client()
+        # Rebuild if the shared HTTP client was closed and replaced since
+        if self._client is None or self._http_client is not http_client:
+            self._client = AsyncOpenAI(api_key=self._api_key, http_client=http_client)
+            self._http_client = http_client
+        return self._client
+    
+    NO_ANSWER = "The Qur'an does not explicitly address this question."
+    
+    # Prefix of the fallback answer explain() returns when the upstream call fails
+    ERROR_PREFIX = "Error generating explanation"
+    
+    # Markdown emphasis characters removed from LLM output (single-pass translate)
+    _STRIP_TABLE = str.maketrans("", "", "*")
+    
+    # Max number of serialized citation bundles kept in memory
+    PROMPT_CACHE_SIZE = 512
+    
+    @classmethod
+    def error_answer(cls, error: Exception) -> str:
+        """Fallback answer text for a failed upstream call."""
+        return f"{cls.ERROR_PREFIX}: {str(error)}"
+    
+    @classmethod
+    def is_error_answer(cls, answer: str) -> bool:
+        """Whether an answer is the fallback for a failed upstream call (see error_answer)."""
+        return answer.startswith(cls.ERROR_PREFIX)
+    
+    @staticmethod
+    def _bundle_key(citation_bundle: dict) -> tuple:
+        """Stable, hashable fingerprint of a citation bundle."""
+        return (
+            citation_bundle.get("query"),
+            citation_bundle.get("k"),
+            citation_bundle.get("score_threshold"),
+            tuple(
+                (r["surah_number"], r["ayah_number"], r["score"], len(r.get("context", [])))
+                for r in citation_bundle.get("results", [])
+            )
+        )
+    
+    def _serialize_bundle(self, citation_bundle: dict) -> str:
+        """Serialize the citation JSON, reusing the result for already-seen bundles."""
+        key = self._bundle_key(citation_bundle)
+        with self._prompt_cache_lock:
+            cached = self._prompt_cache.get(key)
+            if cached is not None:
+                self._prompt_cache.move_to_end(key)
+                return cached
+        
+        # Compact UTF-8 JSON: indentation only adds billed prompt tokens
+        serialized = _dumps(citation_bundle)
+        
+        with self._prompt_cache_lock:
+            self._prompt_cache[key] = serialized
+            if len(self._prompt_cache) > self.PROMPT_CACHE_SIZE:
+                self._prompt_cache.popitem(last=False)
+        return serialized
+    
+    def _build_user_prompt(self, citation_bundle: dict) -> str:
+        """Format the citation JSON into the user prompt."""
+        citation_json_str = self._serialize_bundle(citation_bundle)
+        
+        return f"""Here is the citation JSON:
+{citation_json_str}
+
+Explain the meaning of these verses in clear English."""
     
-    def explain(self, citation_bundle: dict) -> str:
+    async def explain(self, citation_bundle: dict) -> str:
         """
         Takes citation JSON and returns a grounded explanation.
         
@@ -86,41 +211,93 @@ Failure to follow these rules is an error."""
         """
         # Safety check: if no answer, return immediately without calling LLM
         if not citation_bundle.get("has_answer", False) or not citation_bundle.get("results"):
-            return "The Qur'an does not explicitly address this question."
+            return self.NO_ANSWER
         
-        # Format citation JSON for the prompt
-        citation_json_str = json.dumps(citation_bundle, ensure_ascii=False, indent=2)
-        
-        # Construct user prompt
-        user_prompt = f"""Here is the citation JSON:
-{citation_json_str}
-
-Explain the meaning of these verses in clear English."""
+        key = self._bundle_key(citation_bundle)
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._explain(citation_bundle))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
         
         try:
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            # Extract explanation text
-            explanation = response.choices[0].message.content.strip()
-            
-            # Remove markdown formatting if present (keep plain text)
-            explanation = explanation.replace("**", "").replace("*", "")
+            # Shield so one cancelled caller doesn't cancel the shared call
+            return await asyncio.shield(inflight)
+        except Exception as e:
+            return self.error_answer(e)
+    
+    async def _explain(self, citation_bundle: dict) -> str:
+        """Call the LLM for a citation bundle (no single-flight dedup)."""
+        # Thin wrapper over the streaming call so both paths share one implementation
+        tokens = [token async for token in self.explain_stream(citation_bundle)]
+        return "".join(tokens).strip()
+    
+    async def explain_stream(self, citation_bundle: dict) -> AsyncIterator[str]:
+        """
+        Streams the explanation as it is generated (time-to-first-token instead of
+        full-generation latency). Markdown emphasis is stripped, as in explain().
+        
+        Args:
+            citation_bundle: Citation JSON from retrieve_citation_bundle()
             
-            return explanation
+        Yields:
+            Plain text fragments of the explanation
             
-        except Exception as e:
-            return f"Error generating explanation: {str(e)}"
+        Raises:
+            Any upstream (OpenAI / network) error, possibly after some fragments
+            were yielded; explain() turns it into a fallback message instead
+        """
+        if not citation_bundle.get("has_answer", False) or not citation_bundle.get("results"):
+            yield self.NO_ANSWER
+            return
+        
+        user_prompt = self._build_user_prompt(citation_bundle)
+        # Bounded by max_tokens, so an unbounded queue is fine
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def pull() -> None:
+            # The upstream slot is held only while reading from OpenAI, never while
+            # the consumer (e.g. a slow SSE client) is still draining tokens
+            try:
+                async with _UPSTREAM_SEMAPHORE:
+                    stream = await self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=[self._system_msg, {"role": "user", "content": user_prompt}],
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        stream=True,
+                        extra_body={"prompt_cache_key": self.PROMPT_CACHE_KEY}
+                    )
+                    
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        token = chunk.choices[0].delta.content
+                        if token:
+                            # Remove markdown formatting if present (keep plain text)
+                            token = token.translate(self._STRIP_TABLE)
+                            if token:
+                                queue.put_nowait(token)
+            except Exception as e:
+                # Re-raised on the consumer side
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(_STREAM_END)
+        
+        producer = asyncio.ensure_future(pull())
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer gone early (disconnect / error): stop reading upstream
+            producer.cancel()
     
-    def answer_query(
+    async def answer_query(
         self,
         query: str,
         retrieval: QuranRetrieval,
@@ -141,8 +318,9 @@ Explain the meaning of these verses in clear English."""
         Returns:
             Explanation string
         """
-        # Get citation bundle
-        citation_bundle = retrieval.retrieve_citation_bundle(
+        # Get citation bundle (CPU-bound embedding + FAISS search, off the event loop)
+        citation_bundle = await asyncio.to_thread(
+            retrieval.retrieve_citation_bundle,
             query=query,
             k=k,
             score_threshold=score_threshold,
@@ -150,7 +328,7 @@ Explain the meaning of these verses in clear English."""
         )
         
         # Generate explanation
-        explanation = self.explain(citation_bundle)
+        explanation = await self.explain(citation_bundle)
         
         return explanation
 
@@ -173,13 +351,13 @@ def main():
     print("=" * 70)
     
     # Get explanation
-    explanation = explainer.answer_query(
+    explanation = asyncio.run(explainer.answer_query(
         query=query,
         retrieval=retrieval,
         k=5,
         score_threshold=0.5,
         window=1
-    )
+    ))
     
     print("\nExplanation:")
     print(explanation)